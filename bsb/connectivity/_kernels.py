@@ -0,0 +1,110 @@
+"""
+Numba kernels of the connectivity strategies. This module is only imported when a
+kernel is first needed, as importing numba is slow.
+"""
+
+import numba
+import numpy as np
+
+_int64_max = np.iinfo(np.int64).max
+
+
+@numba.njit(cache=True)
+def splitmix64(state):
+    # Advance a splitmix64 generator, returns the new state and a random number.
+    state += np.uint64(0x9E3779B97F4A7C15)
+    z = state
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return state, z ^ (z >> np.uint64(31))
+
+
+@numba.njit(cache=True)
+def fill_unique_row(n_pre, row, seen, state):
+    # Fill the row, rejecting draws that are already `seen`. Afterwards only the
+    # drawn entries are reset, so that `seen` can be reused without an O(n_pre) clear.
+    n = np.uint64(n_pre)
+    j = 0
+    while j < len(row):
+        state, z = splitmix64(state)
+        x = np.int64(z % n)
+        if not seen[x]:
+            seen[x] = True
+            row[j] = x
+            j += 1
+    for j in range(len(row)):
+        seen[row[j]] = False
+
+
+@numba.njit(parallel=True, cache=True)
+def sample_sparse(n_pre, out, seed, n_blocks):
+    # Every row draws from its own generator, seeded from `seed` and the row number,
+    # so that the result doesn't depend on the number of threads. The rows are split
+    # into `n_blocks` blocks, that each share a `seen` array. The rejection loop
+    # lives in its own function, as parfor lowering can't handle the `while` inside
+    # of a `prange` body.
+    n_rows = out.shape[0]
+    n_blocks = max(1, min(n_blocks, n_rows))
+    for b in numba.prange(n_blocks):
+        seen = np.zeros(n_pre, dtype=np.bool_)
+        for i in range(b * n_rows // n_blocks, (b + 1) * n_rows // n_blocks):
+            _, state = splitmix64(np.uint64(seed) + np.uint64(i))
+            fill_unique_row(n_pre, out[i], seen, state)
+
+
+@numba.njit(cache=True)
+def parse_edge_csv(buf, delimiter, skip_rows):
+    # Parse the first 2 integer columns of a csv in a single pass over its bytes.
+    # Returns whether the parse succeeded, so that anything that isn't a plain
+    # integer edge list can be left to a general purpose reader.
+    out = np.empty((1024, 2), dtype=np.int64)
+    n = len(buf)
+    i = 0
+    while skip_rows > 0 and i < n:
+        if buf[i] == 10:
+            skip_rows -= 1
+        i += 1
+    rows = 0
+    col = 0
+    val = 0
+    sign = 1
+    in_field = False
+    field_ended = False
+    while i <= n:
+        # Treat the end of the file as a final newline.
+        c = buf[i] if i < n else 10
+        i += 1
+        if 48 <= c <= 57:
+            # Leave values that would overflow to the general purpose readers.
+            if field_ended or val > (_int64_max - (c - 48)) // 10:
+                return out[:0], False
+            val = val * 10 + (c - 48)
+            in_field = True
+        elif c == 45 and not in_field and sign == 1:
+            sign = -1
+        elif c == delimiter or c == 10:
+            if in_field:
+                if col < 2:
+                    if rows == len(out):
+                        grown = np.empty((2 * len(out), 2), dtype=np.int64)
+                        grown[:rows] = out[:rows]
+                        out = grown
+                    out[rows, col] = sign * val
+                col += 1
+            elif c == delimiter or sign == -1:
+                return out[:0], False
+            if c == 10:
+                if col == 1:
+                    return out[:0], False
+                elif col > 1:
+                    rows += 1
+                col = 0
+            val = 0
+            sign = 1
+            in_field = False
+            field_ended = False
+        elif c == 13 or c == 32 or c == 9:
+            field_ended = in_field
+        else:
+            return out[:0], False
+    return out[:rows].copy(), True
@@ -1,10 +1,41 @@
 import numpy as np
 import functools
+import os
+import warnings
 from .strategy import ConnectionStrategy
 from .. import config, _util as _gutil
+from ..config import types
 from ..exceptions import *
 from ..reporting import report, warn
 
+try:
+    import pandas as _pd
+
+    _has_pandas = True
+except ImportError:
+    _has_pandas = False
+
+try:
+    import pyarrow as _pa
+    import pyarrow.csv as _pacsv
+
+    _has_pyarrow = True
+except ImportError:
+    _has_pyarrow = False
+
+_int32_max = np.iinfo(np.int32).max
+_int64_max = np.iinfo(np.int64).max
+
+
+@functools.cache
+def _load_kernels():
+    # Import the numba kernels on first use, so that importing bsb doesn't import numba.
+    try:
+        from . import _kernels
+    except ImportError:
+        return None
+    return _kernels
+
 
 @config.node
 class Convergence(ConnectionStrategy):
@@ -13,7 +44,7 @@ class Convergence(ConnectionStrategy):
     two populations of cells (this does not work with entities)
     """
 
-    convergence = config.attr(type=float, required=True)
+    convergence = config.attr(type=types.int(min=0), required=True)
 
     def validate(self):
         pass
@@ -24,23 +55,68 @@ class Convergence(ConnectionStrategy):
         to_type = self.postsynaptic.type
         pre = self.from_cells[from_type.name]
         post = self.to_cells[to_type.name]
-        convergence = self.convergence
+        conv = self.convergence
+        n_pre, n_post = len(pre), len(post)
 
-        pre_post = np.zeros((convergence * len(post), 2))
-        for i, neuron in enumerate(post):
-            connected_pre = np.random.choice(pre[:, 0], convergence, replace=False)
-            range_i = range(i * convergence, (i + 1) * convergence)
-            pre_post[range_i, 0] = connected_pre.astype(int)
-            pre_post[range_i, 1] = neuron[0]
+        rng = np.random.default_rng()
+        if not n_post or not conv:
+            idx = np.empty((n_post, conv), dtype=np.int64)
+        elif conv > n_pre:
+            raise ConnectivityError(
+                f"Can't connect {conv} of {n_pre} presynaptic cells in `{self.name}`."
+            )
+        elif conv / n_pre < 0.01:
+            idx = _sample_sparse(rng, n_pre, n_post, conv)
+        else:
+            idx = _sample_dense(rng, n_pre, n_post, conv)
+        max_id = max(pre[:, 0].max(initial=0), post[:, 0].max(initial=0))
+        pre_post = np.empty((conv * n_post, 2), dtype=_id_dtype(max_id))
+        pre_post[:, 0] = pre[idx, 0].ravel()
+        pre_post[:, 1] = np.repeat(post[:, 0], conv)
 
         self.scaffold.connect_cells(self, pre_post)
 
 
+def _sample_dense(rng, n_pre, n_post, k, max_keys=2**24):
+    # Sample without replacement for batches of postsynaptic cells at once: the indices
+    # of the `k` smallest random keys of each row are a uniform sample. The batches are
+    # limited to `max_keys` keys, so that large populations don't exhaust the memory.
+    idx = np.empty((n_post, k), dtype=np.int64)
+    batch = max(1, max_keys // max(n_pre, 1))
+    for start in range(0, n_post, batch):
+        keys = rng.random((min(batch, n_post - start), n_pre))
+        idx[start : start + len(keys)] = keys.argpartition(k - 1, axis=1)[:, :k]
+    return idx
+
+
+def _sample_sparse(rng, n_pre, n_post, k):
+    # When `k` is much smaller than `n_pre`, collisions are rare, so we draw with
+    # replacement and only redraw the duplicates, instead of ranking all `n_pre`
+    # candidates of every row.
+    kernels = _load_kernels()
+    if kernels is not None:
+        idx = np.empty((n_post, k), dtype=np.int64)
+        seed = rng.integers(_int64_max)
+        kernels.sample_sparse(n_pre, idx, seed, kernels.numba.get_num_threads())
+        return idx
+    idx = rng.integers(0, n_pre, size=(n_post, k))
+    dup = np.zeros(idx.shape, dtype=bool)
+    while True:
+        idx.sort(axis=1)
+        np.equal(idx[:, 1:], idx[:, :-1], out=dup[:, 1:])
+        n_dup = np.count_nonzero(dup)
+        if not n_dup:
+            return idx
+        idx[dup] = rng.integers(0, n_pre, size=n_dup)
+
+
 class AllToAll(ConnectionStrategy):
     """
     All to all connectivity between two neural populations
     """
 
+    roi_is_global = True
+
     def get_region_of_interest(self, chunk):
         # All to all needs all pre chunks per post chunk.
         # Fingers crossed for out of memory errors.
@@ -58,10 +134,13 @@ class AllToAll(ConnectionStrategy):
             for to_ps in post.placement.values():
                 l = len(to_ps)
                 ml = fl * l
-                src_locs = np.full((ml, 3), -1)
-                dest_locs = np.full((ml, 3), -1)
-                src_locs[:, 0] = np.repeat(np.arange(fl), l)
-                dest_locs[:, 0] = np.tile(np.arange(l), fl)
+                dtype = _id_dtype(max(fl, l))
+                src_locs = np.full((ml, 3), -1, dtype=dtype)
+                dest_locs = np.full((ml, 3), -1, dtype=dtype)
+                # Write the broadcasted index grids straight into the location
+                # columns, without materializing `repeat` and `tile` temporaries.
+                src_locs.reshape(fl, l, 3)[:, :, 0] = np.arange(fl)[:, None]
+                dest_locs.reshape(fl, l, 3)[:, :, 0] = np.arange(l)[None, :]
                 self.connect_cells(from_ps, to_ps, src_locs, dest_locs)
 
 
@@ -89,6 +168,11 @@ class ExternalConnections(ConnectionStrategy):
         return self.source
 
     def validate(self):
+        if len(self.delimiter) != 1:
+            raise ConfigurationError(
+                f"The delimiter of `{self.name}` must be a single character,"
+                f" got '{self.delimiter}'."
+            )
         if self.warn_missing and not self.check_external_source():
             src = self.get_external_source()
             warn(f"Missing external source '{src}' for '{self.name}'")
@@ -103,26 +187,150 @@ class ExternalConnections(ConnectionStrategy):
             raise RuntimeError(f"Missing source file '{src}' for `{self.name}`.")
         from_type = self.from_cell_types[0]
         to_type = self.to_cell_types[0]
-        # Read the entire csv, skipping the headers if there are any.
-        data = np.loadtxt(
-            self.get_external_source(),
-            skiprows=int(self.headers),
-            delimiter=self.delimiter,
-        )
+        data = self._read_csv(self.get_external_source())
         if self.use_map:
-            emap_name = lambda t: t.placement.name + "_ext_map"
-            from_gid_map = self.scaffold.load_appendix(emap_name(from_type))
-            to_gid_map = self.scaffold.load_appendix(emap_name(to_type))
-            from_targets = self.scaffold.get_placement_set(from_type).identifiers
-            to_targets = self.scaffold.get_placement_set(to_type).identifiers
-            data[:, 0] = self._map(data[:, 0], from_gid_map, from_targets)
-            data[:, 1] = self._map(data[:, 1], to_gid_map, to_targets)
-        self.scaffold.connect_cells(self, data)
-
-    def _map(self, data, map, targets):
-        # Create a dict with pairs between the map and the target values
-        # Vectorize its dictionary lookup and perform the vector function on the data
-        try:
-            return np.vectorize(dict(zip(map, targets)).get)(data)
-        except TypeError:
+            # Sort each map only once, even if both columns use it.
+            maps = {}
+            for col, cell_type in enumerate((from_type, to_type)):
+                if cell_type.name not in maps:
+                    maps[cell_type.name] = self._get_gid_map(cell_type)
+                data[:, col] = _map_gids(data[:, col], *maps[cell_type.name])
+        self.scaffold.connect_cells(self, _narrow_ids(data))
+
+    def _get_gid_map(self, cell_type):
+        emap_name = cell_type.placement.name + "_ext_map"
+        return _sort_gid_map(
+            self.scaffold.load_appendix(emap_name),
+            self.scaffold.get_placement_set(cell_type).identifiers,
+        )
+
+    def _read_csv(self, source):
+        # Read the GID pairs of the entire csv, skipping the headers if there are any.
+        # Try the readers from fastest to most general, they all reject the same files.
+        skip_rows = int(self.headers)
+        if _has_pyarrow:
+            return _read_csv_pyarrow(source, self.delimiter, skip_rows)
+        kernels = _load_kernels()
+        if kernels is not None:
+            data = _read_csv_numba(kernels, source, self.delimiter, skip_rows)
+            if data is not None:
+                return data
+        if _has_pandas:
+            return _read_csv_pandas(source, self.delimiter, skip_rows)
+        return _read_csv_numpy(source, self.delimiter, skip_rows)
+
+
+def _has_rows(source, skip_rows):
+    with open(source, "rb") as f:
+        for _ in range(skip_rows):
+            f.readline()
+        return any(line.strip() for line in f)
+
+
+def _read_csv_pyarrow(source, delimiter, skip_rows):
+    # pyarrow refuses files without any rows to infer the columns from.
+    if not _has_rows(source, skip_rows):
+        return np.empty((0, 2), dtype=np.int64)
+    # Have pyarrow convert the columns, so that non-integer values raise an error. Without
+    # any null values, empty cells raise an error too, instead of becoming NaN.
+    int_cols = {"f0": _pa.int64(), "f1": _pa.int64()}
+    table = _pacsv.read_csv(
+        source,
+        read_options=_pacsv.ReadOptions(
+            skip_rows=skip_rows, autogenerate_column_names=True
+        ),
+        parse_options=_pacsv.ParseOptions(delimiter=delimiter),
+        convert_options=_pacsv.ConvertOptions(
+            include_columns=list(int_cols), column_types=int_cols, null_values=[]
+        ),
+    )
+    return np.column_stack([c.to_numpy() for c in table.columns])
+
+
+def _read_csv_numba(kernels, source, delimiter, skip_rows):
+    # Returns `None` if the file isn't a plain integer edge list.
+    if not os.path.getsize(source):
+        return np.empty((0, 2), dtype=np.int64)
+    buf = np.memmap(source, dtype=np.uint8, mode="r")
+    data, ok = kernels.parse_edge_csv(buf, ord(delimiter), skip_rows)
+    return data if ok else None
+
+
+def _read_csv_pandas(source, delimiter, skip_rows):
+    # pandas casts floats like `1.0` to the requested integer dtype without complaint, so
+    # let it infer the dtype instead and reject anything that isn't int64.
+    try:
+        data = _pd.read_csv(
+            source,
+            header=None,
+            skiprows=skip_rows,
+            sep=delimiter,
+            usecols=(0, 1),
+            engine="c",
+        ).to_numpy()
+    except _pd.errors.EmptyDataError:
+        return np.empty((0, 2), dtype=np.int64)
+    if data.dtype != np.int64:
+        raise ValueError(f"Non-integer values in '{source}'.")
+    return data
+
+
+def _read_csv_numpy(source, delimiter, skip_rows):
+    # Explicit integer columns let NumPy's C parser take its fast integer path. It only
+    # warns when it truncates floats, so turn that into an error like the other readers.
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        return np.loadtxt(
+            source,
+            skiprows=skip_rows,
+            delimiter=delimiter,
+            usecols=(0, 1),
+            dtype=np.int64,
+            ndmin=2,
+        )
+
+
+def _id_dtype(max_id):
+    # Cell ids rarely exceed the int32 range, and halving their size halves the memory
+    # traffic of the connection arrays.
+    return np.int32 if max_id <= _int32_max else np.int64
+
+
+def _narrow_ids(data):
+    # Narrow int64 ids to int32, if they all fit.
+    if not data.size or (data.min() >= -_int32_max - 1 and data.max() <= _int32_max):
+        return data.astype(np.int32)
+    return data
+
+
+def _sort_gid_map(gid_map, targets):
+    # Sort an external GID map, so that data can be looked up in it with a binary search.
+    # If the GIDs are dense and their range is small enough, a lookup table is built as
+    # well. Sparse maps would waste memory on the gaps, so they only get the search.
+    gid_map, targets = np.asarray(gid_map), np.asarray(targets)
+    order = np.argsort(gid_map)
+    sorted_map, sorted_targets = gid_map[order], targets[order]
+    lut = None
+    span = sorted_map[-1] - sorted_map[0] + 1 if len(sorted_map) else 0
+    if span and span <= 10**7 and span <= 4 * len(sorted_map):
+        lut = np.full(span, -1, dtype=np.int64)
+        lut[sorted_map - sorted_map[0]] = sorted_targets
+    return sorted_map, sorted_targets, lut
+
+
+def _map_gids(data, sorted_map, sorted_targets, lut):
+    if lut is not None:
+        # Dense maps are looked up directly in a table offset by the smallest GID.
+        rel = data - sorted_map[0]
+        if len(rel) and (rel.min() < 0 or rel.max() >= len(lut)):
+            raise SourceQualityError("Missing GIDs in external map.")
+        mapped = lut[rel]
+        if (mapped == -1).any():
             raise SourceQualityError("Missing GIDs in external map.")
+        return mapped
+    pos = np.searchsorted(sorted_map, data)
+    found = pos < len(sorted_map)
+    found[found] = sorted_map[pos[found]] == data[found]
+    if not found.all():
+        raise SourceQualityError("Missing GIDs in external map.")
+    return sorted_targets[pos]
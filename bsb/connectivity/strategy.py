@@ -4,6 +4,8 @@ from .._util import SortableByAfter, obj_str_insert
 from ..reporting import report, warn
 from ..exceptions import *
 import abc
+import functools
+from collections import defaultdict
 from itertools import chain
 
 
@@ -27,7 +29,7 @@ class ConnectionCollection:
     def __iter__(self):
         return iter(self.cell_types)
 
-    @property
+    @functools.cached_property
     def placement(self):
         return {ct: ct.get_placement_set(self.roi) for ct in self.cell_types}
 
@@ -44,6 +46,9 @@ class ConnectionStrategy(abc.ABC, SortableByAfter):
     presynaptic = config.attr(type=HemitypeNode, required=True)
     postsynaptic = config.attr(type=HemitypeNode, required=True)
     after = config.reflist(refs.connectivity_ref)
+    # Strategies whose region of interest doesn't depend on the chunk can set this, so
+    # that it is determined only once when queueing.
+    roi_is_global = False
 
     def __boot__(self):
         self._queued_jobs = []
@@ -90,31 +95,42 @@ class ConnectionStrategy(abc.ABC, SortableByAfter):
     def get_region_of_interest(self, chunk):
         pass
 
-    def queue(self, pool):
+    def queue(self, pool, placed_chunks=None):
         """
         Specifies how to queue this connectivity strategy into a job pool. Can
         be overridden, the default implementation asks each partition to chunk
         itself and creates 1 placement job per chunk.
+
+        :param placed_chunks: Chunks of each cell type, filled as they are looked up.
+          Pass the same dict to all strategies of a queueing pass to share the lookups.
+        :type placed_chunks: dict
         """
+        if placed_chunks is None:
+            placed_chunks = {}
         # Reset jobs that we own
         self._queued_jobs = []
         # Get the queued jobs of all the strategies we depend on.
         deps = set(chain.from_iterable(strat._queued_jobs for strat in self.get_after()))
         pre_types = self.presynaptic.cell_types
         # Iterate over each chunk that is populated by our presynaptic cell types.
-        from_chunks = set(
-            chain.from_iterable(
-                ct.get_placement_set().get_all_chunks() for ct in pre_types
-            )
-        )
+        for ct in pre_types:
+            if ct not in placed_chunks:
+                placed_chunks[ct] = ct.get_placement_set().get_all_chunks()
+        from_chunks = set(chain.from_iterable(placed_chunks[ct] for ct in pre_types))
         # For determining the ROI, it's more logical and often easier to determine where
         # axons can go, then where they can come from, so we let them do that, and flip
         # the results around to get our single-post-chunk, multi-pre-chunk ROI. We store
         # "connections arriving on", not "connections going to" for each cell.
-        rois = {}
-        for chunk in from_chunks:
-            for to_chunk in self.get_region_of_interest(chunk):
-                rois.setdefault(to_chunk, []).append(chunk)
+        if self.roi_is_global and from_chunks:
+            # Every chunk has the same ROI, so every post chunk receives from all chunks.
+            to_chunks = self.get_region_of_interest(next(iter(from_chunks)))
+            roi = list(from_chunks)
+            rois = {to_chunk: roi for to_chunk in to_chunks}
+        else:
+            rois = defaultdict(list)
+            for chunk in from_chunks:
+                for to_chunk in self.get_region_of_interest(chunk):
+                    rois[to_chunk].append(chunk)
 
         for chunk, roi in rois.items():
             job = pool.queue_connectivity(self, chunk, roi, deps=deps)
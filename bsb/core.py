@@ -231,8 +231,10 @@ class Scaffold:
         strategies = ConnectionStrategy.resolve_order(strategies)
         pool = create_job_pool(self)
         if pool.is_master():
+            # Strategies often share presynaptic cell types, so share their chunks.
+            placed_chunks = {}
             for strategy in strategies:
-                strategy.queue(pool)
+                strategy.queue(pool, placed_chunks)
             loop = self._progress_terminal_loop(pool, debug=DEBUG)
             try:
                 pool.execute(loop)
@@ -20,6 +20,8 @@ class Chunk(np.ndarray):
         return obj
 
     def __array_finalize__(self, obj):
+        # Views may have different coordinates, so they have to compute their own hash.
+        self._hash = None
         if obj is not None:
             self._size = getattr(obj, "_size", None)
 
@@ -44,7 +46,10 @@ class Chunk(np.ndarray):
         return self.id <= other.id
 
     def __hash__(self):
-        return int(self.id)
+        # Chunks are hashed over and over as keys while queueing jobs, so cache the id.
+        if getattr(self, "_hash", None) is None:
+            self._hash = int(self.id)
+        return self._hash
 
     def __reduce__(self):
         # Pickle ourselves, appending the `_size` attribute to our reduced state
@@ -56,6 +61,7 @@ class Chunk(np.ndarray):
         # Unpickle ourselves, grabbing the state we appended for `_size`
         super().__setstate__(state[:-1])
         self._size = state[-1]
+        self._hash = None
 
     def _safe_id(self):
         return int(self) if self.shape == () else self.id
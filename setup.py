@@ -18,7 +18,7 @@ with open("README.md", "r") as fh:
 requires = [
     "bsb-hdf5~=0.3.3",
     "h5py~=3.0",
-    "numpy~=1.19",
+    "numpy~=1.23",
     "scipy~=1.5",
     "scikit-learn~=1.0",
     "plotly~=5.5",
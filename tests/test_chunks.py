@@ -62,3 +62,11 @@ class TestChunks(unittest.TestCase):
         self.assertTrue(Chunk([0, 1, 1], None) >= Chunk([0, 1, 1], None), "ge chunk fail")
         self.assertTrue(Chunk([0, 1, 1], None) <= Chunk([0, 1, 1], None), "le chunk fail")
         self.assertTrue(Chunk([0, 1, 1], None) <= Chunk([0, 2, 1], None), "le chunk fail")
+
+    def test_hash(self):
+        self.assertEqual(Chunk([0, 1, 1], None).id, hash(Chunk([0, 1, 1], None)))
+        chunks = {Chunk([0, 1, 1], None), Chunk([0, 1, 1], None), Chunk([1, 0, 0], None)}
+        self.assertEqual(2, len(chunks), "equal chunks should hash equal")
+        c = Chunk([1, 2, 3], None)
+        hash(c)
+        self.assertEqual(c[1:].id, hash(c[1:]), "views should not reuse chunk hash")
@@ -4,8 +4,28 @@ from bsb.unittest import (
     FixedPosConfigFixture,
     RandomStorageFixture,
 )
+from bsb.connectivity import general
+from bsb.exceptions import SourceQualityError
 import unittest
+import importlib
+import functools
+import tempfile
+import os
 import numpy as np
+from unittest import mock
+
+
+def numba_installed():
+    return importlib.util.find_spec("numba")
+
+
+class _RecordingPool:
+    def __init__(self):
+        self.jobs = []
+
+    def queue_connectivity(self, strategy, chunk, roi, deps=None):
+        self.jobs.append((chunk, roi))
+        return len(self.jobs)
 
 
 class TestAllToAll(
@@ -68,3 +88,183 @@ class TestAllToAll(
         self.assertEqual(
             100 * 100, len(self.network.get_connectivity_set("test_cell_to_test_cell"))
         )
+
+    def test_global_roi(self):
+        # The global ROI shortcut should queue the same jobs as the per chunk loop.
+        strat = self.network.connectivity["all_to_all"]
+
+        def queued_rois():
+            pool = _RecordingPool()
+            strat.queue(pool)
+            return {c.id: sorted(r.id for r in roi) for c, roi in pool.jobs}
+
+        global_rois = queued_rois()
+        with mock.patch.object(type(strat), "roi_is_global", False):
+            chunk_rois = queued_rois()
+        self.assertEqual(4, len(global_rois), "expected a job per chunk")
+        self.assertEqual(chunk_rois, global_rois)
+
+
+class TestConvergenceSampling(NumpyTestCase, unittest.TestCase):
+    def assertUniqueRows(self, idx, shape, n_pre):
+        self.assertEqual(shape, idx.shape, "unexpected sample shape")
+        self.assertTrue(np.all((idx >= 0) & (idx < n_pre)), "samples out of range")
+        for row in idx:
+            self.assertEqual(len(row), len(np.unique(row)), "duplicate pre cells")
+
+    def test_dense(self):
+        rng = np.random.default_rng()
+        self.assertUniqueRows(general._sample_dense(rng, 50, 300, 20), (300, 20), 50)
+        # Batches smaller than the number of rows should still fill every row.
+        idx = general._sample_dense(rng, 50, 300, 20, max_keys=120)
+        self.assertUniqueRows(idx, (300, 20), 50)
+        # Taking every candidate is a permutation.
+        idx = general._sample_dense(rng, 5, 3, 5)
+        self.assertClose(np.tile(np.arange(5), (3, 1)), np.sort(idx, axis=1))
+
+    def test_sparse(self):
+        rng = np.random.default_rng()
+        with mock.patch.object(general, "_load_kernels", lambda: None):
+            idx = general._sample_sparse(rng, 2000, 500, 10)
+            self.assertUniqueRows(idx, (500, 10), 2000)
+            # Force a lot of collisions, to exercise the redraws.
+            idx = general._sample_sparse(rng, 20, 50, 19)
+            self.assertUniqueRows(idx, (50, 19), 20)
+
+    @unittest.skipIf(not numba_installed(), "numba is not importable.")
+    def test_sparse_jit(self):
+        idx = np.empty((500, 10), dtype=np.int64)
+        general._load_kernels().sample_sparse(2000, idx, 1, 4)
+        self.assertUniqueRows(idx, (500, 10), 2000)
+        # Rows that need all but one of the candidates still have to terminate.
+        idx = np.empty((50, 19), dtype=np.int64)
+        general._load_kernels().sample_sparse(20, idx, 1, 4)
+        self.assertUniqueRows(idx, (50, 19), 20)
+
+    @unittest.skipIf(not numba_installed(), "numba is not importable.")
+    def test_sparse_jit_seed(self):
+        a = general._sample_sparse(np.random.default_rng(42), 2000, 300, 10)
+        b = general._sample_sparse(np.random.default_rng(42), 2000, 300, 10)
+        self.assertClose(a, b, "same rng should give the same sample")
+        c = general._sample_sparse(np.random.default_rng(43), 2000, 300, 10)
+        self.assertFalse(np.array_equal(a, c), "different rng gave the same sample")
+        # The sample shouldn't depend on how the rows are divided over the threads.
+        a, b = np.empty((300, 10), dtype=np.int64), np.empty((300, 10), dtype=np.int64)
+        general._load_kernels().sample_sparse(2000, a, 7, 1)
+        general._load_kernels().sample_sparse(2000, b, 7, 5)
+        self.assertClose(a, b, "sample depends on the number of blocks")
+
+
+@unittest.skipIf(not numba_installed(), "numba is not importable.")
+class TestEdgeCsvScanner(NumpyTestCase, unittest.TestCase):
+    def parse(self, text, skip_rows=0):
+        buf = np.frombuffer(text.encode(), dtype=np.uint8)
+        return general._load_kernels().parse_edge_csv(buf, ord(","), skip_rows)
+
+    def test_parse(self):
+        data, ok = self.parse("pre,post\n1,2\r\n-3, 4,5\n\n6,7", skip_rows=1)
+        self.assertTrue(ok, "plain edge list rejected")
+        self.assertClose([[1, 2], [-3, 4], [6, 7]], data)
+
+    def test_reject(self):
+        for text in ("1,2.5\n", "1,\n", "1\n", "1 2,3\n", "a,b\n"):
+            with self.subTest(text=text):
+                self.assertFalse(self.parse(text)[1], "non integer edge list accepted")
+
+    def test_overflow(self):
+        self.assertTrue(self.parse(f"{2**63 - 1},1")[1], "int64 max rejected")
+        self.assertFalse(self.parse("99999999999999999999,1")[1], "overflow accepted")
+
+
+class TestIdDtype(unittest.TestCase):
+    def test_id_dtype(self):
+        self.assertEqual(np.int32, general._id_dtype(2**31 - 1))
+        self.assertEqual(np.int64, general._id_dtype(2**31))
+
+    def test_narrow_ids(self):
+        data = np.array([[0, 2**31 - 1], [-(2**31), 5]], dtype=np.int64)
+        self.assertEqual(np.int32, general._narrow_ids(data).dtype)
+        self.assertEqual(np.int32, general._narrow_ids(np.empty((0, 2), int)).dtype)
+        data = np.array([[3000000000, 1]], dtype=np.int64)
+        narrowed = general._narrow_ids(data)
+        self.assertEqual(np.int64, narrowed.dtype, "ids out of int32 range narrowed")
+        self.assertEqual(3000000000, narrowed[0, 0])
+
+
+class TestEdgeCsvReaders(NumpyTestCase, unittest.TestCase):
+    def setUp(self):
+        self.readers = {"numpy": general._read_csv_numpy}
+        if importlib.util.find_spec("pandas"):
+            self.readers["pandas"] = general._read_csv_pandas
+        if importlib.util.find_spec("pyarrow"):
+            self.readers["pyarrow"] = general._read_csv_pyarrow
+        if numba_installed():
+            self.readers["numba"] = functools.partial(
+                general._read_csv_numba, general._load_kernels()
+            )
+
+    def write(self, text):
+        fd, path = tempfile.mkstemp(suffix=".csv")
+        with os.fdopen(fd, "w") as f:
+            f.write(text)
+        self.addCleanup(os.remove, path)
+        return path
+
+    def read_all(self, text, skip_rows=1):
+        path = self.write(text)
+        return {
+            name: reader(path, ",", skip_rows) for name, reader in self.readers.items()
+        }
+
+    def test_agree(self):
+        for name, data in self.read_all("pre,post\n1,2\n3000000000,4\n").items():
+            with self.subTest(reader=name):
+                self.assertEqual(np.int64, data.dtype)
+                self.assertClose([[1, 2], [3000000000, 4]], data)
+
+    def test_headers_only(self):
+        for name, data in self.read_all("pre,post\n").items():
+            with self.subTest(reader=name):
+                self.assertEqual((0, 2), data.shape)
+
+    def test_non_integer(self):
+        for text in ("pre,post\n1,3.5\n", "pre,post\n1.0,2.0\n", "pre,post\n1,\n"):
+            path = self.write(text)
+            for name, reader in self.readers.items():
+                with self.subTest(text=text, reader=name):
+                    if name == "numba":
+                        self.assertIsNone(reader(path, ",", 1), "numba accepted a float")
+                    else:
+                        with self.assertRaises(ValueError):
+                            reader(path, ",", 1)
+
+
+class TestGidMap(NumpyTestCase, unittest.TestCase):
+    def test_lut(self):
+        gid_map = general._sort_gid_map([13, 10, 12], [0, 1, 2])
+        self.assertIsNotNone(gid_map[2], "expected a lookup table for a dense map")
+        self.assertClose(
+            [1, 0, 2, 1], general._map_gids(np.array([10, 13, 12, 10]), *gid_map)
+        )
+
+    def test_searchsorted(self):
+        gid_map = general._sort_gid_map([3 * 10**9, 10, 5 * 10**8], [0, 1, 2])
+        self.assertIsNone(gid_map[2], "expected no lookup table for a sparse map")
+        data = np.array([5 * 10**8, 3 * 10**9, 10])
+        self.assertClose([2, 0, 1], general._map_gids(data, *gid_map))
+        # A small range with large gaps shouldn't get a lookup table either.
+        gid_map = general._sort_gid_map([0, 9_999_999], [0, 1])
+        self.assertIsNone(gid_map[2], "expected no lookup table for a sparse map")
+        self.assertClose([1, 0], general._map_gids(np.array([9_999_999, 0]), *gid_map))
+
+    def test_missing(self):
+        maps = {
+            "lut": general._sort_gid_map([13, 10, 12], [0, 1, 2]),
+            "searchsorted": general._sort_gid_map([3 * 10**9, 10], [0, 1]),
+            "empty": general._sort_gid_map([], []),
+        }
+        for name, gid_map in maps.items():
+            for gid in (5, 11, 4 * 10**9):
+                with self.subTest(map=name, gid=gid):
+                    with self.assertRaises(SourceQualityError):
+                        general._map_gids(np.array([10, gid]), *gid_map)
@@ -406,52 +406,53 @@ class TestMorphometry(NumpyTestCase, unittest.TestCase):
 
 
 class TestSwcFiles(NumpyTestCase, unittest.TestCase):
-    # Helper functions to create a toy morphology
+    # Helper functions to create a toy morphology, returning (n, 3) point arrays
     def generate_semicircle(self, center_x, center_y, radius, stepsize=0.01):
         x = np.arange(center_x, center_x + radius + stepsize, stepsize)
         y = np.sqrt(radius**2 - x**2)
 
-        x = np.concatenate([x, x[::-1]])
-        y = np.concatenate([y, -y[::-1]])
-        z = np.zeros(y.shape)
+        n = len(x)
+        points = np.zeros((2 * n, 3))
+        points[:n, 0] = x
+        points[n:, 0] = x[::-1]
+        points[:n, 1] = y + center_y
+        points[n:, 1] = -y[::-1] + center_y
 
-        return x, y + center_y, z
+        return points
 
     def generate_exponential(self, center_x, center_y, len=10, stepsize=0.1):
         x = np.arange(center_x, center_x + len + stepsize, stepsize)
-        y = np.exp(x)
-        z = np.zeros(y.shape)
+        points = np.zeros((x.shape[0], 3))
+        points[:, 0] = -x
+        points[:, 1] = np.exp(x) + center_y
 
-        return -x, y + center_y, z
+        return points
 
     def generate_radius(
         self, origin_x, origin_y, len=10, angle=(np.pi / 2), stepsize=0.1
     ):
         l = np.arange(0, len + stepsize, stepsize)
-        x = l * np.cos(angle) + origin_x
-        y = l * np.sin(angle) + origin_y
-        z = np.zeros(y.shape)
+        points = np.zeros((l.shape[0], 3))
+        points[:, 0] = l * np.cos(angle) + origin_x
+        points[:, 1] = l * np.sin(angle) + origin_y
 
-        return x, y, z
+        return points
 
     def setUp(self):
         # Creating the branches
-        x_s, y_s, z_s = self.generate_semicircle(0, 6, 5, 0.01)
-        x_e, y_e, z_e = self.generate_exponential(0, 0, 5, 0.01)
-        x_ri, y_ri, z_ri = self.generate_radius(0, 11, len=10)
-        x_rii, y_rii, z_rii = self.generate_radius(0, 11, angle=np.pi / 3, len=10)
-        x_riii, y_riii, z_riii = self.generate_radius(
-            0, 11, angle=(2 / 3) * np.pi, len=10
-        )
+        semi = self.generate_semicircle(0, 6, 5, 0.01)
+        semi[:, 1] = semi[::-1, 1]
+        exp = self.generate_exponential(0, 0, 5, 0.01)
+        ri = self.generate_radius(0, 11, len=10)
+        rii = self.generate_radius(0, 11, angle=np.pi / 3, len=10)
+        riii = self.generate_radius(0, 11, angle=(2 / 3) * np.pi, len=10)
 
         root = Branch(np.array([0.0, 1.0, 0.0]).reshape(1, 3), radii=1)
-        exp_child = Branch(np.vstack((x_e, y_e, z_e)).T, radii=[1] * len(x_e))
-        semi_child = Branch(np.vstack((x_s, y_s[::-1], z_s)).T, radii=[1] * len(x_s))
-        ri_child = Branch(np.vstack((x_ri, y_ri, z_ri)).T, radii=[1] * len(x_ri))
-        rii_child = Branch(np.vstack((x_rii, y_rii, z_rii)).T, radii=[1] * len(x_rii))
-        riii_child = Branch(
-            np.vstack((x_riii, y_riii, z_riii)).T, radii=[1] * len(x_riii)
-        )
+        exp_child = Branch(exp, radii=[1] * len(exp))
+        semi_child = Branch(semi, radii=[1] * len(semi))
+        ri_child = Branch(ri, radii=[1] * len(ri))
+        rii_child = Branch(rii, radii=[1] * len(rii))
+        riii_child = Branch(riii, radii=[1] * len(riii))
         semi_child.attach_child(ri_child)
         semi_child.attach_child(rii_child)
         semi_child.attach_child(riii_child)